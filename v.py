@@ -1,23 +1,70 @@
-import speech_recognition as sr
 import pyttsx3
 import datetime
 import random
-import json
+import orjson
 import os
-from typing import Dict, List, Optional
+import re
+import wave
+import hashlib
+import threading
+import contextlib
+import itertools
+import queue
+from typing import AsyncIterator, Callable, Deque, Dict, List, Optional, Set, Tuple
 import ollama
 import asyncio
+import aiofiles
+import numpy as np
+import hnswlib
+import sounddevice as sd
+import webrtcvad
+from faster_whisper import WhisperModel
+from sentence_transformers import SentenceTransformer
 from concurrent.futures import ThreadPoolExecutor
-from functools import lru_cache
+from collections import OrderedDict, deque
+
+MEMORY_FILE = 'assistant_memory.json'
+MEMORY_LOG = 'assistant_memory.jsonl'
+CACHE_FILE = 'assistant_cache.npz'
+CACHE_INDEX = 'assistant_cache.bin'
+TTS_CACHE_DIR = 'tts_cache'
+
+try:
+    from numba import njit
+except ImportError:
+    def njit(**kwargs):
+        """Leave functions as plain Python when numba is not installed."""
+        return lambda func: func
+
+
+@njit(cache=True)
+def _sentence_end(buf: str) -> int:
+    """Return the index of the first sentence terminator followed by whitespace, or -1."""
+    for i in range(len(buf) - 1):
+        if buf[i] in '.!?' and buf[i + 1].isspace():
+            return i
+    return -1
+
 
 class FastVoiceAssistant:
     def __init__(self, name: str = "Assistant", model: str = "tinyllama"):
         self.name = name
         self.model = model
-        self.memory: Dict[str, List[str]] = {
-            "conversations": [],
-            "tasks": [],
-            "preferences": []
+        self.keep_alive = "30m"  # keep the model loaded between turns
+        self.system_prompt = "Answer in one short sentence."
+        self.generation_options = {
+            'num_predict': 60,
+            'temperature': 0.7,
+            'top_k': 40,
+            'stop': ['\n\n']
+        }
+        self.memory_limits: Dict[str, Optional[int]] = {
+            "conversations": 1000,
+            "tasks": 10000,
+            "preferences": None
+        }
+        self.memory: Dict[str, Deque[str]] = {
+            key: deque(maxlen=limit) for key, limit in self.memory_limits.items()
         }
         
         # Initialize speech engine
@@ -25,16 +72,87 @@ class FastVoiceAssistant:
         self.engine.setProperty('rate', 175)
         self.engine.setProperty('volume', 0.9)
         
-        # Initialize speech recognizer
-        self.recognizer = sr.Recognizer()
-        self.recognizer.energy_threshold = 300
-        self.recognizer.dynamic_energy_threshold = False
+        # Fixed phrases are synthesized once and played back as raw audio
+        self.cached_phrases = ("Goodbye!", "Hi! How can I help?", "Could you repeat that?", "Ready to help!")
+        self._wav_cache = self._build_wav_cache()
+        
+        # Keep the TTS loop running and pump it from asyncio
+        self.engine.connect('finished-utterance', self._on_utterance_end)
+        self.engine.startLoop(False)
+        self._utterances: Dict[str, asyncio.Event] = {}
+        self._utterance_ids = itertools.count()
+        self._tts_task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        
+        # Initialize local int8 speech recognizer; the second worker lets the
+        # final transcript decode alongside a partial instead of queueing behind it
+        self.asr = WhisperModel('tiny.en', device='cpu', compute_type='int8', num_workers=2)
+        
+        # Microphone stream, opened once per session by run(), feeding a 30s ring buffer
+        self.sample_rate = 16000
+        self._ring: Deque[bytes] = deque(maxlen=300)
+        self._vad = webrtcvad.Vad(2)
+        self._endpoint_blocks = 4      # 0.4s of silence ends a phrase
+        self._max_phrase_blocks = 50   # 5s phrase limit
+        self._min_speech_blocks = 3    # shorter bursts are treated as noise
+        self._preroll_blocks = 3
+        self._voiced = 0
+        self._speech_blocks = 0
+        self._silence = 0
+        self._listening = threading.Event()
+        self._speaking = threading.Event()
+        self._phrases: "queue.Queue[Tuple[bool, bytes]]" = queue.Queue()
+        self._mic: Optional[sd.RawInputStream] = None
+        
+        # Simplified fillers, stored with their separator
+        self.fillers = ("ok, ", "hmm, ", "ah, ")
+        
+        # Compile the sentence splitter before the first streamed reply
+        _sentence_end(". ")
+        
+        # Quick responses for common commands, matched as whole words
+        self._quick_responses: Dict[str, Callable[[], str]] = {
+            "time": self._say_time,
+            "date": self._say_date,
+            "hello": lambda: "Hi! How can I help?",
+            "bye": lambda: "Goodbye!",
+            "goodbye": lambda: "Goodbye!"
+        }
+        self._quick_re = re.compile(r'\b(' + '|'.join(self._quick_responses) + r')\b')
         
-        # Simplified fillers
-        self.fillers = ["ok", "hmm", "ah"]
+        # Response cache, least recently used entry evicted first
+        self.response_cache: "OrderedDict[str, str]" = OrderedDict()
+        self.response_cache_size = 100
         
-        # Response cache
-        self.response_cache = {}
+        # Semantic cache: HNSW index over prompt embeddings, labelled by ring slot
+        self.embedder = SentenceTransformer('all-MiniLM-L6-v2')
+        self.cache_threshold = 0.85
+        self.cache_size = 100_000
+        self._ann = self._new_ann_index()
+        self.cache_texts: List[str] = []
+        self.cache_responses: List[str] = []
+        self._cache_next = 0
+        
+        # Responses speculatively generated from partial transcripts
+        self.prefetch_threshold = 0.9
+        self._prefetched: Dict[int, Tuple[np.ndarray, asyncio.Task, asyncio.Queue]] = {}
+        self._prefetch_tasks: Set[asyncio.Task] = set()
+        self._turn = 0  # bumped at the end of each turn so late partials are dropped
+        
+        # Generations in flight, shared by concurrent callers with matching prompts
+        self._inflight: Dict[str, Tuple[np.ndarray, asyncio.Future]] = {}
+        
+        # Append-only memory log, folded into a snapshot periodically
+        self.snapshot_interval = 60
+        self._log = None
+        self._log_entries = 0
+        self._memory_lock = asyncio.Lock()
+        self._snapshot_task: Optional[asyncio.Task] = None
+        
+        # Shared worker threads for all blocking work: the microphone wait, a
+        # partial decode, a prefetch and a final generation stream, plus
+        # embeddings and playback
+        self._executor = ThreadPoolExecutor(max_workers=6, thread_name_prefix="va")
         
         # Load memory if exists
         self.load_memory()
@@ -44,147 +162,630 @@ class FastVoiceAssistant:
         try:
             print(f"Checking {self.model} model...")
             await self._run_in_thread(lambda: ollama.pull(self.model))
+            # An empty prompt loads the model without generating anything
+            await self._run_in_thread(
+                lambda: ollama.generate(model=self.model, prompt='', keep_alive=self.keep_alive)
+            )
             print("Model setup complete!")
         except Exception as e:
             print(f"Error setting up model: {e}")
             raise
 
+    async def _warm_up(self) -> None:
+        """Run a one-token chat so the first real turn skips cold-start work."""
+        try:
+            await self._run_in_thread(
+                lambda: ollama.chat(
+                    model=self.model,
+                    messages=[{'role': 'user', 'content': 'hi'}],
+                    options={'num_predict': 1},
+                    keep_alive=self.keep_alive
+                )
+            )
+        except Exception as e:
+            print(f"Error warming up model: {e}")
+
     async def _run_in_thread(self, func):
         """Run synchronous functions in a thread pool."""
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func)
+
+    async def close(self) -> None:
+        """Stop background tasks, persist the semantic cache and release the log, TTS loop and worker threads."""
+        self._reset_prefetch()
+        for task in (self._tts_task, self._snapshot_task):
+            if task:
+                task.cancel()
+        if self._log:
+            await self._log.close()
+        # Not on _executor, which is shut down right after
+        await asyncio.to_thread(self._save_cache)
+        self.engine.endLoop()
+        self._executor.shutdown(wait=False)
+
+    async def _embed(self, text: str) -> np.ndarray:
+        """Encode text as an L2-normalized embedding off the event loop."""
+        return await self._run_in_thread(
+            lambda: self.embedder.encode([text], normalize_embeddings=True)[0].astype(np.float32)
+        )
+
+    def _new_ann_index(self) -> hnswlib.Index:
+        """Create an empty cosine HNSW index sized for the semantic cache."""
+        index = hnswlib.Index(space='cosine', dim=self.embedder.get_sentence_embedding_dimension())
+        index.init_index(max_elements=self.cache_size, ef_construction=200, M=16)
+        index.set_ef(50)
+        return index
+
+    def _semantic_lookup(self, query: np.ndarray) -> Optional[str]:
+        """Return the response cached for the most similar prompt, if close enough."""
+        if not self.cache_texts:
+            return None
+        labels, dists = self._ann.knn_query(query, k=1)
+        if 1 - dists[0][0] >= self.cache_threshold:
+            return self.cache_responses[labels[0][0]]
+        return None
+
+    def _semantic_store(self, prompt: str, query: np.ndarray, response: str) -> None:
+        """Add a prompt/response pair, overwriting the oldest entry when full."""
+        slot = self._cache_next
+        self._ann.add_items(query, [slot])
+        if slot < len(self.cache_texts):
+            self.cache_texts[slot] = prompt
+            self.cache_responses[slot] = response
+        else:
+            self.cache_texts.append(prompt)
+            self.cache_responses.append(response)
+        self._cache_next = (slot + 1) % self.cache_size
+
+    async def _stream_ollama(self, prompt: str) -> AsyncIterator[str]:
+        """Yield response text from Ollama as it is generated."""
         loop = asyncio.get_running_loop()
-        with ThreadPoolExecutor() as executor:
-            return await loop.run_in_executor(executor, func)
+        pieces: asyncio.Queue = asyncio.Queue()
+        stop = threading.Event()
+
+        def produce() -> None:
+            try:
+                stream = ollama.chat(
+                    model=self.model,
+                    messages=[
+                        {'role': 'system', 'content': self.system_prompt},
+                        {'role': 'user', 'content': prompt}
+                    ],
+                    options=self.generation_options,
+                    stream=True,
+                    keep_alive=self.keep_alive
+                )
+                for chunk in stream:
+                    if stop.is_set():
+                        break
+                    loop.call_soon_threadsafe(pieces.put_nowait, chunk['message']['content'])
+            finally:
+                loop.call_soon_threadsafe(pieces.put_nowait, None)
 
-    @lru_cache(maxsize=100)
-    def _get_cached_response(self, prompt: str) -> Optional[str]:
-        """Get cached response if available."""
-        return self.response_cache.get(prompt)
+        producer = loop.run_in_executor(self._executor, produce)
+        try:
+            while (piece := await pieces.get()) is not None:
+                yield piece
+            await producer
+        finally:
+            stop.set()
 
-    async def get_ollama_response(self, prompt: str) -> str:
-        """Get response from Ollama model."""
+    async def stream_response(self, prompt: str, query: Optional[np.ndarray] = None) -> AsyncIterator[str]:
+        """Yield the response to a prompt one sentence at a time, reusing its embedding if given."""
         try:
             # Check cache first
-            cached_response = self._get_cached_response(prompt)
+            if prompt in self.response_cache:
+                self.response_cache.move_to_end(prompt)
+                yield self.response_cache[prompt]
+                return
+
+            # Fall back to a semantically similar prompt
+            if query is None:
+                query = await self._embed(prompt)
+            cached_response = self._semantic_lookup(query)
             if cached_response:
-                return cached_response
+                yield cached_response
+                return
 
-            # Generate response
-            response = await self._run_in_thread(
-                lambda: ollama.chat(
-                    model=self.model,
-                    messages=[{
-                        'role': 'user',
-                        'content': self._build_prompt(prompt)
-                    }]
-                )
-            )
+            # Share a generation already running for a matching prompt
+            shared = await self._join_inflight(prompt, query)
+            if shared is not None:
+                yield shared
+                return
 
-            # Extract response text
-            if isinstance(response, dict) and 'message' in response:
-                response_text = response['message']['content']
-            else:
-                response_text = str(response)
+            future = asyncio.get_running_loop().create_future()
+            self._inflight[prompt] = (query, future)
+            try:
+                # Generate response, handing back each sentence once it ends
+                chunks: List[str] = []
+                buf = ""
+                async for piece in self._stream_ollama(prompt):
+                    chunks.append(piece)
+                    buf += piece
+                    end = _sentence_end(buf)
+                    while end >= 0:
+                        yield buf[:end + 1]
+                        buf = buf[end + 1:]
+                        end = _sentence_end(buf)
+                if buf.strip():
+                    yield buf
 
-            # Cache the response
-            self.response_cache[prompt] = response_text
-            return response_text
+                # Cache the full response
+                response_text = "".join(chunks)
+                self.response_cache[prompt] = response_text
+                if len(self.response_cache) > self.response_cache_size:
+                    self.response_cache.popitem(last=False)
+                self._semantic_store(prompt, query, response_text)
+                future.set_result(response_text)
+            finally:
+                self._inflight.pop(prompt, None)
+                if not future.done():
+                    future.cancel()
 
         except Exception as e:
             print(f"Error getting Ollama response: {e}")
-            return "I'm having trouble processing that right now."
+            yield "I'm having trouble processing that right now."
+
+    async def _join_inflight(self, prompt: str, query: np.ndarray) -> Optional[str]:
+        """Wait for an in-flight generation of the same or a near-identical prompt."""
+        pending = self._inflight.get(prompt)
+        if pending is None:
+            pending = next(
+                (entry for entry in self._inflight.values()
+                 if float(entry[0] @ query) >= self.cache_threshold),
+                None
+            )
+        if pending is None:
+            return None
 
-    def _build_prompt(self, user_input: str) -> str:
-        """Build minimal prompt for faster processing."""
-        return f"Respond concisely to: {user_input}"
+        future = pending[1]
+        try:
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            if future.cancelled():
+                return None  # the owner gave up, so generate our own
+            raise
 
-    def speak(self, text: str, interrupt: bool = False) -> None:
+    async def get_ollama_response(self, prompt: str) -> str:
+        """Get the full response from Ollama model."""
+        return "".join([sentence async for sentence in self.stream_response(prompt)])
+
+    async def speak(self, text: str, interrupt: bool = False, filler: bool = True) -> None:
         """Convert text to speech with optional interruption."""
         if interrupt:
             self.engine.stop()
+            for done in self._utterances.values():
+                done.set()
+            self._utterances.clear()
+            sd.stop()
         
-        if random.random() < 0.2:
-            text = f"{random.choice(self.fillers)}, {text}"
+        cached = self._wav_cache.get(text)
+        if cached is None and filler and random.getrandbits(4) < 3:  # ~20% of replies
+            text = random.choice(self.fillers) + text
         
         print(f"{self.name}: {text}")
-        self.engine.say(text)
-        self.engine.runAndWait()
+        if cached is not None:
+            await self._play(*cached)
+        else:
+            await self._say(text)
 
-    def listen(self) -> Optional[str]:
-        """Listen to user input with optimized settings."""
-        with sr.Microphone() as source:
-            print("\nListening...")
+    def _build_wav_cache(self) -> Dict[str, Tuple[np.ndarray, int]]:
+        """Synthesize fixed phrases to WAV files once and load them as PCM."""
+        os.makedirs(TTS_CACHE_DIR, exist_ok=True)
+        paths = {
+            phrase: os.path.join(TTS_CACHE_DIR, hashlib.sha1(phrase.encode()).hexdigest() + '.wav')
+            for phrase in self.cached_phrases
+        }
+        missing = [phrase for phrase, path in paths.items() if not os.path.exists(path)]
+        if missing:
+            for phrase in missing:
+                self.engine.save_to_file(phrase, paths[phrase])
+            self.engine.runAndWait()
+
+        cache = {}
+        for phrase, path in paths.items():
             try:
-                audio = self.recognizer.listen(source, timeout=3, phrase_time_limit=5)
-                text = self.recognizer.recognize_google(audio)
-                print(f"You: {text}")
-                self.memory["conversations"].append(text)
-                return text.lower()
-            except (sr.WaitTimeoutError, sr.UnknownValueError):
-                self.speak("Could you repeat that?")
+                with wave.open(path, 'rb') as f:
+                    if f.getsampwidth() != 2:
+                        continue
+                    pcm = np.frombuffer(f.readframes(f.getnframes()), dtype=np.int16)
+                    cache[phrase] = (pcm.reshape(-1, f.getnchannels()), f.getframerate())
             except Exception as e:
-                print(f"Error: {e}")
+                print(f"Error loading cached speech: {e}")
+        return cache
+
+    async def _play(self, pcm: np.ndarray, rate: int) -> None:
+        """Play pre-synthesized audio and wait for it to finish."""
+        sd.play(pcm, rate)
+        await self._run_in_thread(sd.wait)
+
+    async def _say(self, text: str) -> None:
+        """Queue text on the TTS loop and wait until it has been spoken."""
+        if self._tts_task is None:
+            self._loop = asyncio.get_running_loop()
+            self._tts_task = asyncio.create_task(self._tts_pump())
+
+        name = str(next(self._utterance_ids))
+        done = asyncio.Event()
+        self._utterances[name] = done
+        self.engine.say(text, name)
+        await done.wait()
+
+    def _on_utterance_end(self, name: str, completed: bool) -> None:
+        """Wake the speaker waiting on a finished utterance."""
+        done = self._utterances.pop(name, None)
+        if done and self._loop:
+            self._loop.call_soon_threadsafe(done.set)
+
+    async def _tts_pump(self) -> None:
+        """Drive the TTS event loop without blocking asyncio."""
+        while True:
+            self.engine.iterate()
+            await asyncio.sleep(0.01)
+
+    async def listen(self) -> Optional[str]:
+        """Listen to user input with optimized settings."""
+        try:
+            loop = asyncio.get_running_loop()
+            text = await self._run_in_thread(lambda: self._listen_sync(loop))
+        except Exception as e:
+            print(f"Error: {e}")
+            self._reset_prefetch()
+            return None
+
+        if not text:
+            self._reset_prefetch()
+            await self.speak("Could you repeat that?")
             return None
+        print(f"You: {text}")
+        await self._remember("conversations", text)
+        return text.lower()
+
+    def _listen_sync(self, loop: asyncio.AbstractEventLoop) -> str:
+        """Wait for the next phrase from the microphone and transcribe it; runs off the event loop."""
+        # Drop anything segmented before this turn, e.g. our own speech
+        while not self._phrases.empty():
+            self._phrases.get_nowait()
+
+        print("\nListening...")
+        self._listening.set()
+        try:
+            if not self._speaking.wait(timeout=3):
+                return ""
+            while True:
+                try:
+                    final, pcm = self._phrases.get(timeout=6)
+                except queue.Empty:
+                    return ""
+                if final:
+                    return self._transcribe(pcm)
+                loop.call_soon_threadsafe(self._prefetch_partial, pcm)
+        finally:
+            self._listening.clear()
+
+    def _transcribe(self, pcm: bytes) -> str:
+        """Transcribe 16-bit mono PCM audio to text."""
+        samples = np.frombuffer(pcm, dtype=np.int16).astype(np.float32) / 32768.0
+        segments, _ = self.asr.transcribe(samples, beam_size=1, vad_filter=True)
+        return "".join(segment.text for segment in segments).strip()
+
+    def _open_mic(self) -> sd.RawInputStream:
+        """Open and start a microphone stream feeding the ring buffer."""
+        mic = sd.RawInputStream(
+            samplerate=self.sample_rate,
+            channels=1,
+            dtype='int16',
+            blocksize=1600,
+            callback=self._audio_cb
+        )
+        mic.start()
+        return mic
+
+    def _audio_cb(self, indata, frames: int, time, status) -> None:
+        """Buffer microphone audio and cut phrases at VAD endpoints."""
+        block = bytes(indata)
+        self._ring.append(block)
+        if not self._listening.is_set():
+            self._voiced = self._speech_blocks = self._silence = 0
+            self._speaking.clear()
+            return
+
+        # webrtcvad only takes 10/20/30ms frames, so vote over 20ms slices
+        frame = self.sample_rate // 50 * 2
+        votes = sum(
+            self._vad.is_speech(block[i:i + frame], self.sample_rate)
+            for i in range(0, len(block) - frame + 1, frame)
+        )
+        if votes * 2 > len(block) // frame:
+            self._speaking.set()
+            self._voiced += 1
+            self._speech_blocks += 1
+            self._silence = 0
+        elif self._voiced:
+            self._voiced += 1
+            self._silence += 1
+        else:
+            return
+
+        if self._silence >= self._endpoint_blocks or self._voiced >= self._max_phrase_blocks:
+            if self._speech_blocks >= self._min_speech_blocks:
+                self._phrases.put((True, self._phrase_audio()))
+            self._voiced = self._speech_blocks = self._silence = 0
+            self._speaking.clear()
+        elif self._voiced % 10 == 0:
+            # Hand each extra second of speech to the prefetcher as it arrives
+            self._phrases.put((False, self._phrase_audio()))
+
+    def _phrase_audio(self) -> bytes:
+        """Slice the current phrase, plus a little lead-in, out of the ring buffer."""
+        count = min(self._voiced + self._preroll_blocks, len(self._ring))
+        return b"".join(itertools.islice(self._ring, len(self._ring) - count, None))
+
+    def _prefetch_partial(self, pcm: bytes) -> None:
+        """Schedule a prefetch for a partial utterance."""
+        if self._prefetch_tasks:
+            return  # still decoding an earlier partial; the next one supersedes it anyway
+        task = asyncio.create_task(self._prefetch(pcm, self._turn))
+        self._prefetch_tasks.add(task)
+        task.add_done_callback(self._prefetch_tasks.discard)
+
+    async def _prefetch(self, pcm: bytes, turn: int) -> None:
+        """Start generating a response from a partial utterance."""
+        try:
+            partial = await self._run_in_thread(lambda: self._transcribe(pcm))
+        except Exception:
+            return
+        if turn != self._turn:
+            return  # the final command was already claimed
+        partial = partial.lower()
+        key = hash(partial)
+        if not partial or key in self._prefetched or self._match_quick_response(partial):
+            return
+
+        partial_emb = await self._embed(partial)
+        if turn != self._turn:
+            return
+
+        # A longer partial supersedes any earlier guess
+        for _, task, _ in self._prefetched.values():
+            task.cancel()
+        sentences: asyncio.Queue = asyncio.Queue()
+        task = asyncio.create_task(self._prefetch_sentences(partial, partial_emb, sentences))
+        self._prefetched = {key: (partial_emb, task, sentences)}
+
+    async def _prefetch_sentences(self, partial: str, partial_emb: np.ndarray, sentences: asyncio.Queue) -> None:
+        """Stream the response to a partial utterance into a sentence queue."""
+        try:
+            async for sentence in self.stream_response(partial, partial_emb):
+                sentences.put_nowait(sentence)
+        finally:
+            sentences.put_nowait(None)
+
+    async def _drain_prefetch(self, task: asyncio.Task, sentences: asyncio.Queue) -> AsyncIterator[str]:
+        """Yield a claimed prefetch's sentences as they are generated."""
+        while (sentence := await sentences.get()) is not None:
+            yield sentence
+        await task
+
+    def _reset_prefetch(self) -> None:
+        """End the turn: cancel partial decodes and drop any unclaimed prefetch."""
+        self._turn += 1
+        for task in self._prefetch_tasks:
+            task.cancel()
+        for _, task, _ in self._prefetched.values():
+            task.cancel()
+        self._prefetched = {}
+
+    def _claim_prefetch(self, query: np.ndarray) -> Optional[Tuple[asyncio.Task, asyncio.Queue]]:
+        """Return the prefetched response if its partial matches the final command's embedding."""
+        prefetched, self._prefetched = self._prefetched, {}
+        self._reset_prefetch()
+        if not prefetched:
+            return None
+
+        claimed = None
+        for partial_emb, task, sentences in prefetched.values():
+            if claimed is None and float(partial_emb @ query) >= self.prefetch_threshold:
+                claimed = task, sentences
+            else:
+                task.cancel()
+        return claimed
+
+    def _match_quick_response(self, command: str) -> Optional[Tuple[str, Callable[[], str]]]:
+        """Find the quick response handler for a command, if any."""
+        match = self._quick_re.search(command)
+        if match:
+            key = match.group(1)
+            return key, self._quick_responses[key]
+        return None
+
+    def _say_time(self) -> str:
+        """Describe the current time."""
+        return f"It's {datetime.datetime.now().strftime('%I:%M %p')}"
+
+    def _say_date(self) -> str:
+        """Describe today's date."""
+        return f"Today is {datetime.datetime.now().strftime('%B %d, %Y')}"
 
     async def process_command(self, command: str) -> bool:
         """Process commands with optimized response handling."""
         if not command:
+            self._reset_prefetch()
             return False
 
-        # Quick responses for common commands
-        quick_responses = {
-            "time": lambda: f"It's {datetime.datetime.now().strftime('%I:%M %p')}",
-            "date": lambda: f"Today is {datetime.datetime.now().strftime('%B %d, %Y')}",
-            "hello": lambda: f"Hi! How can I help?",
-            "bye": lambda: "Goodbye!",
-            "goodbye": lambda: "Goodbye!"
-        }
-
         # Check for quick responses first
-        for key, response_func in quick_responses.items():
-            if key in command:
-                self.speak(response_func())
-                return key in ["bye", "goodbye"]
-
-        # Use Ollama for other responses
-        response = await self.get_ollama_response(command)
-        if not response.endswith(('.', '!', '?')):
-            response += '.'
-        self.speak(response)
+        quick = self._match_quick_response(command)
+        if quick:
+            self._reset_prefetch()
+            key, response_func = quick
+            await self.speak(response_func())
+            return key in ["bye", "goodbye"]
+
+        # Reuse a response prefetched while the user was still speaking,
+        # otherwise ask Ollama; either way speak each sentence as it arrives
+        query = await self._embed(command)
+        prefetched = self._claim_prefetch(query)
+        if prefetched:
+            sentences = self._drain_prefetch(*prefetched)
+        else:
+            sentences = self.stream_response(command, query)
+
+        first = True
+        async for sentence in sentences:
+            sentence = sentence.strip()
+            if not sentence:
+                continue
+            if not sentence.endswith(('.', '!', '?')):
+                sentence += '.'
+            await self.speak(sentence, filler=first)
+            first = False
         return False
 
+    async def _remember(self, key: str, value: str) -> None:
+        """Add an entry to memory and append it to the memory log."""
+        async with self._memory_lock:
+            self.memory[key].append(value)
+            if self._log:
+                await self._log.write(orjson.dumps({key: value}, option=orjson.OPT_APPEND_NEWLINE))
+                await self._log.flush()
+                self._log_entries += 1
+
+    async def _snapshot_loop(self) -> None:
+        """Fold the memory log into a fresh snapshot every interval."""
+        while True:
+            await asyncio.sleep(self.snapshot_interval)
+            try:
+                await self._snapshot()
+            except Exception as e:
+                print(f"Error saving memory: {e}")
+
+    async def _snapshot(self) -> None:
+        """Atomically replace the memory snapshot and reset the log."""
+        async with self._memory_lock:
+            if not self._log_entries:
+                return
+            tmp = MEMORY_FILE + '.tmp'
+            async with aiofiles.open(tmp, 'wb') as f:
+                await f.write(self._dump_memory())
+            os.replace(tmp, MEMORY_FILE)
+            await self._log.truncate(0)
+            self._log_entries = 0
+
+    def _dump_memory(self) -> bytes:
+        """Serialize memory to JSON, writing each deque as a list."""
+        return orjson.dumps(self.memory, default=list, option=orjson.OPT_APPEND_NEWLINE)
+
+    async def flush_memory(self) -> None:
+        """Stop periodic snapshots, then save memory under the memory lock."""
+        if self._snapshot_task:
+            # Let a snapshot that is mid-write close its temp file before it is reused
+            self._snapshot_task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._snapshot_task
+            self._snapshot_task = None
+        async with self._memory_lock:
+            self.save_memory()
+
     def save_memory(self) -> None:
         """Save memory to a JSON file."""
         try:
-            with open('assistant_memory.json', 'w') as f:
-                json.dump(self.memory, f)
+            tmp = MEMORY_FILE + '.tmp'
+            with open(tmp, 'wb') as f:
+                f.write(self._dump_memory())
+            os.replace(tmp, MEMORY_FILE)
+            # Everything logged so far is now in the snapshot
+            open(MEMORY_LOG, 'w').close()
+            self._log_entries = 0
         except Exception as e:
             print(f"Error saving memory: {e}")
+        self._save_cache()
+
+    def _save_cache(self) -> None:
+        """Save the semantic cache and its index next to the memory file."""
+        try:
+            np.savez(
+                CACHE_FILE,
+                texts=np.array(self.cache_texts, dtype=str),
+                responses=np.array(self.cache_responses, dtype=str),
+                next=self._cache_next
+            )
+            self._ann.save_index(CACHE_INDEX)
+        except Exception as e:
+            print(f"Error saving cache: {e}")
 
     def load_memory(self) -> None:
-        """Load memory from JSON file if it exists."""
+        """Load memory from the JSON snapshot and replay the memory log if they exist."""
+        # Merge into the default schema so missing or malformed sections keep their defaults
         try:
-            if os.path.exists('assistant_memory.json'):
-                with open('assistant_memory.json', 'r') as f:
-                    self.memory = json.load(f)
+            if os.path.exists(MEMORY_FILE):
+                with open(MEMORY_FILE, 'rb') as f:
+                    loaded = orjson.loads(f.read())
+                if isinstance(loaded, dict):
+                    for key, limit in self.memory_limits.items():
+                        if isinstance(loaded.get(key), list):
+                            self.memory[key] = deque(loaded[key], maxlen=limit)
         except Exception as e:
             print(f"Error loading memory: {e}")
 
+        try:
+            if os.path.exists(MEMORY_LOG):
+                with open(MEMORY_LOG, 'rb') as f:
+                    for line in f:
+                        try:
+                            entry = orjson.loads(line)
+                        except ValueError:
+                            continue  # torn write from a crash
+                        if not isinstance(entry, dict):
+                            continue
+                        for key, value in entry.items():
+                            if key in self.memory:
+                                self.memory[key].append(value)
+        except Exception as e:
+            print(f"Error loading memory log: {e}")
+        self._load_cache()
+
+    def _load_cache(self) -> None:
+        """Load the semantic cache and its index if they exist."""
+        try:
+            if os.path.exists(CACHE_FILE) and os.path.exists(CACHE_INDEX):
+                with np.load(CACHE_FILE) as data:
+                    texts = data['texts'].tolist()
+                    responses = data['responses'].tolist()
+                    next_slot = int(data['next'])
+                self._ann.load_index(CACHE_INDEX, max_elements=self.cache_size)
+                self._ann.set_ef(50)
+                if self._ann.get_current_count() != len(texts):
+                    self._ann = self._new_ann_index()
+                    return
+                self.cache_texts = texts
+                self.cache_responses = responses
+                self._cache_next = next_slot
+        except Exception as e:
+            self._ann = self._new_ann_index()
+            print(f"Error loading cache: {e}")
+
     async def run(self) -> None:
         """Main loop with optimized processing."""
         try:
-            await self.setup_model()
-            self.speak("Ready to help!")
-            
-            while True:
-                command = self.listen()
-                if command:
-                    should_exit = await self.process_command(command)
-                    if should_exit:
-                        break
+            async with contextlib.AsyncExitStack() as stack:
+                # Open the microphone once for the whole session, off the event loop
+                self._mic = await self._run_in_thread(self._open_mic)
+                stack.push(self._mic.__exit__)
+
+                self._log = await aiofiles.open(MEMORY_LOG, 'ab')
+                self._snapshot_task = asyncio.create_task(self._snapshot_loop())
+                await self.setup_model()
+                await asyncio.gather(self.speak("Ready to help!"), self._warm_up())
+                
+                while True:
+                    command = await self.listen()
+                    if command:
+                        should_exit = await self.process_command(command)
+                        if should_exit:
+                            break
 
         except Exception as e:
             print(f"An error occurred: {e}")
-            self.save_memory()
+            await self.flush_memory()
 
 
 async def main():
@@ -194,10 +795,12 @@ async def main():
         await assistant.run()
     except KeyboardInterrupt:
         print("\nShutting down...")
-        assistant.save_memory()
+        await assistant.flush_memory()
     except Exception as e:
         print(f"An error occurred: {e}")
-        assistant.save_memory()
+        await assistant.flush_memory()
+    finally:
+        await assistant.close()
 
 
 if __name__ == "__main__":